@@ -9,20 +9,59 @@ Run Instructions:
     3. Open browser at:        http://127.0.0.1:5000
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file
+from flask import (Flask, Response, abort, jsonify, render_template, request, redirect,
+                   url_for, flash, send_file, session, stream_with_context)
+from flask_caching import Cache
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, lambda_stmt, select
+from sqlalchemy.engine import Engine
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+import contextlib
+import glob
 import io
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
+import os
+import queue
+import re
+import shutil
+import tempfile
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+import xlsxwriter
 
 # ── App Setup ──────────────────────────────────────────────────────────────────
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'jobtracker-secret-2024'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///jobs.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Keep the last export on disk under instance/ and serve it until data changes.
+# Write-heavy deployments can turn this off to stream every download fresh.
+app.config['EXPORT_PRERENDER'] = True
+# No SQLALCHEMY_ENGINE_OPTIONS needed: for a file-backed SQLite database
+# SQLAlchemy 2.0 already uses QueuePool(pool_size=5, max_overflow=10) with
+# check_same_thread=False, so WAL readers get their own connections. The busy
+# timeout is set by the PRAGMA below.
 
 db = SQLAlchemy(app)
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 30})
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection: WAL journal, fewer fsyncs, longer busy wait."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-20000')   # ~20 MB page cache
+    cursor.execute('PRAGMA busy_timeout=30000')  # wait up to 30s on a locked DB
+    cursor.close()
 
 # ── Database Model ─────────────────────────────────────────────────────────────
 class JobApplication(db.Model):
@@ -36,12 +75,114 @@ class JobApplication(db.Model):
     status       = db.Column(db.String(50), nullable=False, default='Pending')
     notes        = db.Column(db.Text, default='')
 
+    __table_args__ = (
+        # Dashboard: filter by status, newest first
+        db.Index('ix_status_date', 'status', date_applied.desc()),
+        # Dashboard/export without a filter: newest first
+        db.Index('ix_date', date_applied.desc()),
+    )
+
     def __repr__(self):
         return f'<JobApplication {self.company} – {self.role}>'
 
 
+# Full-text index over company names, kept in sync with job_applications by
+# triggers. The trigram tokenizer matches arbitrary substrings case-
+# insensitively, the same results as the old ILIKE '%q%' but without a scan.
+COMPANY_FTS_TABLE = 'job_applications_fts'
+COMPANY_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {COMPANY_FTS_TABLE} USING fts5(
+        company, content='job_applications', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS job_applications_fts_ai AFTER INSERT ON job_applications BEGIN
+        INSERT INTO {COMPANY_FTS_TABLE}(rowid, company) VALUES (new.id, new.company);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS job_applications_fts_ad AFTER DELETE ON job_applications BEGIN
+        INSERT INTO {COMPANY_FTS_TABLE}({COMPANY_FTS_TABLE}, rowid, company)
+        VALUES ('delete', old.id, old.company);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS job_applications_fts_au AFTER UPDATE OF company ON job_applications BEGIN
+        INSERT INTO {COMPANY_FTS_TABLE}({COMPANY_FTS_TABLE}, rowid, company)
+        VALUES ('delete', old.id, old.company);
+        INSERT INTO {COMPANY_FTS_TABLE}(rowid, company) VALUES (new.id, new.company);
+    END""",
+]
+COMPANY_FTS_MIN_QUERY = 3  # trigram can't match anything shorter
+
+# One-row change counter shared by every process using this database: the
+# triggers bump it on any insert/update/delete of job_applications. The random
+# epoch is set once per database, so a replaced jobs.db never reuses versions.
+DATA_VERSION_DDL = [
+    """CREATE TABLE IF NOT EXISTS data_version (
+        id      INTEGER PRIMARY KEY CHECK (id = 1),
+        epoch   TEXT    NOT NULL,
+        version INTEGER NOT NULL)""",
+    """INSERT OR IGNORE INTO data_version (id, epoch, version)
+        VALUES (1, lower(hex(randomblob(6))), 0)""",
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS job_applications_version_{suffix}
+        AFTER {event_name} ON job_applications BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END"""
+    for suffix, event_name in [('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')]
+]
+
+
+def init_db():
+    """Create tables, indexes and the FTS/version objects missing from the database.
+
+    Every process runs this at startup (see the bottom of this module), so it
+    must be idempotent and safe when several gunicorn workers start at once:
+    BEGIN IMMEDIATE makes them take turns, and each one only creates what the
+    previous ones have not.
+    """
+    with db.engine.connect() as conn:
+        conn.execution_options(isolation_level='AUTOCOMMIT')
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+        try:
+            db.metadata.create_all(conn)
+            # create_all() skips tables that already exist, so older jobs.db
+            # files would never get the newer indexes without this.
+            for index in JobApplication.__table__.indexes:
+                index.create(conn, checkfirst=True)
+
+            fts_exists = db.inspect(conn).has_table(COMPANY_FTS_TABLE)
+            for ddl in COMPANY_FTS_DDL:
+                conn.execute(db.text(ddl))
+            if not fts_exists:
+                # Index the rows that were there before the FTS table existed
+                conn.execute(db.text(
+                    f"INSERT INTO {COMPANY_FTS_TABLE}({COMPANY_FTS_TABLE}) VALUES ('rebuild')"))
+            for ddl in DATA_VERSION_DDL:
+                conn.execute(db.text(ddl))
+            conn.exec_driver_sql('COMMIT')
+        except BaseException:
+            conn.exec_driver_sql('ROLLBACK')
+            raise
+
+
+_DATA_VERSION_SQL = db.text('SELECT epoch, version FROM data_version WHERE id = 1')
+
+
+def get_data_version():
+    """Return ``(epoch, version)`` for the current database contents."""
+    return tuple(db.session.execute(_DATA_VERSION_SQL).one())
+
+
+def company_search(search_query):
+    """Return a WHERE clause matching company names containing ``search_query``."""
+    if len(search_query) < COMPANY_FTS_MIN_QUERY:
+        return JobApplication.company.ilike(f'%{search_query}%')
+    # Quote as an FTS5 phrase so user input is never parsed as query syntax
+    phrase = '"' + search_query.replace('"', '""') + '"'
+    matches = (select(db.literal_column('rowid'))
+               .select_from(db.table(COMPANY_FTS_TABLE))
+               .where(db.text(f'{COMPANY_FTS_TABLE} MATCH :phrase').bindparams(phrase=phrase)))
+    return JobApplication.id.in_(matches)
+
+
 # ── Status Configuration ───────────────────────────────────────────────────────
 STATUS_OPTIONS = ['Pending', 'Interview Scheduled', 'Selected', 'Rejected']
+STATUS_OPTIONS_SET = frozenset(STATUS_OPTIONS)  # O(1) membership checks; keep the list for ordering
 
 STATUS_COLORS = {
     'Pending':            {'bg': '#fff3cd', 'text': '#856404', 'badge': 'warning'},
@@ -50,36 +191,105 @@ STATUS_COLORS = {
     'Rejected':           {'bg': '#f8d7da', 'text': '#842029', 'badge': 'danger'},
 }
 
+# Excel export formats (xlsxwriter properties; turned into Format objects once
+# per workbook so the row loop only passes references).
+EXPORT_HEADER_FORMAT = {
+    'bg_color': '#1A1A2E', 'font_color': '#FFFFFF', 'bold': True, 'font_size': 11,
+    'align': 'center', 'valign': 'vcenter',
+}
+EXPORT_CELL_FORMAT = {'valign': 'vcenter', 'text_wrap': True}
+
+STATUS_ROW_COLORS = {
+    'Pending':             '#FFF3CD',
+    'Interview Scheduled': '#CFE2FF',
+    'Selected':            '#D1E7DD',
+    'Rejected':            '#F8D7DA',
+}
+DEFAULT_ROW_COLOR = '#FFFFFF'
+
+EXPORT_STREAM_CHUNK_SIZE = 64 * 1024  # bytes per chunk sent to the client
+EXPORT_STREAM_QUEUE_SIZE = 64         # chunks buffered between producer and response
+EXPORT_JOB_TTL           = 10 * 60    # seconds a background export's files are kept
+EXPORT_DOWNLOAD_NAME     = 'job_applications.xlsx'
+_EXPORT_FILE_RE          = re.compile(r'export-(?P<epoch>[0-9a-f]+)-v(?P<version>\d+)\.xlsx')
+XLSX_MIMETYPE            = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
 
 # ── Helper: Dashboard Counts ───────────────────────────────────────────────────
+# Built once as a lambda statement: later calls skip constructing the Core
+# statement and go straight to SQLAlchemy's compiled-SQL cache.
+_SUMMARY_STMT = lambda_stmt(
+    lambda: select(JobApplication.status, db.func.count(JobApplication.id))
+    .group_by(JobApplication.status)
+)
+
+
 def get_summary():
-    """Return aggregate counts for the dashboard."""
-    total    = JobApplication.query.count()
-    pending  = JobApplication.query.filter_by(status='Pending').count()
-    rejected = JobApplication.query.filter_by(status='Rejected').count()
-    selected = JobApplication.query.filter_by(status='Selected').count()
-    interview = JobApplication.query.filter_by(status='Interview Scheduled').count()
-    return dict(total=total, pending=pending, rejected=rejected,
-                selected=selected, interview=interview)
+    """Return aggregate counts for the dashboard (single GROUP BY query)."""
+    counts = dict(db.session.execute(_SUMMARY_STMT).all())
+    return dict(total=sum(counts.values()),
+                pending=counts.get('Pending', 0),
+                rejected=counts.get('Rejected', 0),
+                selected=counts.get('Selected', 0),
+                interview=counts.get('Interview Scheduled', 0))
+
+
+# ── Helper: Dashboard Cache ────────────────────────────────────────────────────
+def _index_cache_key(*args, **kwargs):
+    """Cache key for the dashboard: data version + normalised query string."""
+    epoch, version = get_data_version()
+    args_key = urlencode(sorted(request.args.items(multi=True)))
+    return f'view/index/{epoch}-{version}?{args_key}'
+
+
+def _has_pending_flashes():
+    """Never serve or store a cached page while a flash message is waiting."""
+    return '_flashes' in session
+
+
+# ── Helper: Add/Edit Form ──────────────────────────────────────────────────────
+_parse_date = date.fromisoformat  # C-implemented; bound once to skip the attribute lookup
+
+
+def render_form(form_title, action, job=None):
+    """Render the shared add/edit form."""
+    return render_template('form.html', status_options=STATUS_OPTIONS,
+                           form_title=form_title, action=action,
+                           job=job, today=date.today().isoformat())
 
 
 # ── Routes ─────────────────────────────────────────────────────────────────────
 
 @app.route('/')
+@cache.cached(timeout=30, make_cache_key=_index_cache_key, unless=_has_pending_flashes)
 def index():
     """Main dashboard – list all applications with optional filter & search."""
     status_filter = request.args.get('status', '')
     search_query  = request.args.get('search', '').strip()
 
-    query = JobApplication.query
+    # Only the columns the table shows; notes are cut down to a preview in SQL
+    # (the template truncates them further) so long notes are never loaded.
+    query = select(
+        JobApplication.id,
+        JobApplication.company,
+        JobApplication.role,
+        JobApplication.date_applied,
+        JobApplication.status,
+        db.func.substr(JobApplication.notes, 1, 200).label('notes'),
+    )
 
-    if status_filter and status_filter in STATUS_OPTIONS:
-        query = query.filter_by(status=status_filter)
+    if status_filter and status_filter in STATUS_OPTIONS_SET:
+        query = query.where(JobApplication.status == status_filter)
 
     if search_query:
-        query = query.filter(JobApplication.company.ilike(f'%{search_query}%'))
-
-    applications = query.order_by(JobApplication.date_applied.desc()).all()
+        query = query.where(company_search(search_query))
+
+    applications = db.session.execute(
+        query.order_by(JobApplication.date_applied.desc())
+    ).all()
+    # The stat cards always show totals for every status, even on a filtered
+    # view, so the filtered rows can't stand in for them; get_summary() is a
+    # single grouped query either way.
     summary      = get_summary()
 
     return render_template(
@@ -106,12 +316,10 @@ def add():
         # Basic validation
         if not company or not role or not date_str:
             flash('Company, Role, and Date Applied are required.', 'danger')
-            return render_template('form.html', status_options=STATUS_OPTIONS,
-                                   form_title='Add Application', action='add',
-                                   today=date.today().isoformat())
+            return render_form('Add Application', 'add')
 
         try:
-            date_applied = date.fromisoformat(date_str)
+            date_applied = _parse_date(date_str)
         except ValueError:
             flash('Invalid date format.', 'danger')
             return redirect(url_for('add'))
@@ -128,123 +336,454 @@ def add():
         flash(f'Application to <strong>{company}</strong> added successfully!', 'success')
         return redirect(url_for('index'))
 
-    return render_template('form.html', status_options=STATUS_OPTIONS,
-                           form_title='Add Application', action='add',
-                           today=date.today().isoformat(), job=None)
+    return render_form('Add Application', 'add')
 
 
 @app.route('/edit/<int:job_id>', methods=['GET', 'POST'])
 def edit(job_id):
     """Edit an existing job application."""
-    job = JobApplication.query.get_or_404(job_id)
-
     if request.method == 'POST':
-        job.company      = request.form.get('company', '').strip()
-        job.role         = request.form.get('role', '').strip()
-        date_str         = request.form.get('date_applied', '')
-        job.status       = request.form.get('status', 'Pending')
-        job.notes        = request.form.get('notes', '').strip()
+        company      = request.form.get('company', '').strip()
+        role         = request.form.get('role', '').strip()
+        date_str     = request.form.get('date_applied', '')
+        status       = request.form.get('status', 'Pending')
+        notes        = request.form.get('notes', '').strip()
 
-        if not job.company or not job.role or not date_str:
+        if not company or not role or not date_str:
             flash('Company, Role, and Date Applied are required.', 'danger')
-            return render_template('form.html', status_options=STATUS_OPTIONS,
-                                   form_title='Edit Application', action=f'edit/{job_id}',
-                                   job=job, today=date.today().isoformat())
+            # Re-show the submitted values on top of the stored row (not saved)
+            job = JobApplication.query.get_or_404(job_id)
+            job.company, job.role, job.status, job.notes = company, role, status, notes
+            return render_form('Edit Application', f'edit/{job_id}', job)
 
         try:
-            job.date_applied = date.fromisoformat(date_str)
+            date_applied = _parse_date(date_str)
         except ValueError:
+            JobApplication.query.get_or_404(job_id)  # unknown id: 404, not a redirect
             flash('Invalid date format.', 'danger')
             return redirect(url_for('edit', job_id=job_id))
 
+        # One UPDATE … RETURNING round-trip instead of SELECT then UPDATE
+        updated = db.session.execute(
+            db.update(JobApplication)
+            .where(JobApplication.id == job_id)
+            .values(company=company, role=role, date_applied=date_applied,
+                    status=status, notes=notes)
+            .returning(JobApplication.id)
+        ).first()
+        if updated is None:
+            abort(404)
         db.session.commit()
-        flash(f'Application to <strong>{job.company}</strong> updated!', 'success')
+        flash(f'Application to <strong>{company}</strong> updated!', 'success')
         return redirect(url_for('index'))
 
-    return render_template('form.html', status_options=STATUS_OPTIONS,
-                           form_title='Edit Application', action=f'edit/{job_id}',
-                           job=job, today=date.today().isoformat())
+    job = JobApplication.query.get_or_404(job_id)
+    return render_form('Edit Application', f'edit/{job_id}', job)
 
 
 @app.route('/delete/<int:job_id>', methods=['POST'])
 def delete(job_id):
     """Delete a job application (confirmed via modal on the frontend)."""
-    job = JobApplication.query.get_or_404(job_id)
-    company = job.company
-    db.session.delete(job)
+    # One DELETE … RETURNING round-trip instead of SELECT then DELETE
+    company = db.session.execute(
+        db.delete(JobApplication)
+        .where(JobApplication.id == job_id)
+        .returning(JobApplication.company)
+    ).scalar()
+    if company is None:
+        abort(404)
     db.session.commit()
     flash(f'Application to <strong>{company}</strong> deleted.', 'info')
     return redirect(url_for('index'))
 
 
-@app.route('/export')
-def export():
-    """Export all applications to an Excel (.xlsx) file."""
-    applications = JobApplication.query.order_by(JobApplication.date_applied.desc()).all()
+def _build_xlsx(output):
+    """Write all applications as an .xlsx workbook to ``output`` (path or file object)."""
+    # Plain Row tuples fetched in batches: no ORM instances or identity map.
+    stmt = (select(JobApplication.company,
+                   JobApplication.role,
+                   JobApplication.date_applied,
+                   JobApplication.status,
+                   JobApplication.notes)
+            .order_by(JobApplication.date_applied.desc())
+            .execution_options(yield_per=500))
+    applications = db.session.execute(stmt)
+
+    # constant_memory flushes each row to a temp file as soon as the next one
+    # starts, so memory stays flat no matter how many applications there are.
+    wb = xlsxwriter.Workbook(output, {'constant_memory': True, 'in_memory': False})
+    ws = wb.add_worksheet('Job Applications')
+
+    header_format = wb.add_format(EXPORT_HEADER_FORMAT)
+    status_formats = {
+        status: wb.add_format({**EXPORT_CELL_FORMAT, 'bg_color': color})
+        for status, color in STATUS_ROW_COLORS.items()
+    }
+    default_format = wb.add_format({**EXPORT_CELL_FORMAT, 'bg_color': DEFAULT_ROW_COLOR})
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = 'Job Applications'
+    # Column widths
+    col_widths = [5, 25, 25, 15, 22, 40]
+    for i, width in enumerate(col_widths):
+        ws.set_column(i, i, width)
 
-    # Header styling
-    header_fill = PatternFill(start_color='1a1a2e', end_color='1a1a2e', fill_type='solid')
-    header_font = Font(color='FFFFFF', bold=True, size=11)
+    # Header row
     headers = ['#', 'Company', 'Role', 'Date Applied', 'Status', 'Notes']
-
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    # Status background colors for rows
-    status_fill_map = {
-        'Pending':             'FFF3CD',
-        'Interview Scheduled': 'CFE2FF',
-        'Selected':            'D1E7DD',
-        'Rejected':            'F8D7DA',
-    }
+    ws.set_row(0, 20)
+    ws.write_row(0, 0, headers, header_format)
 
     # Data rows
-    for row_num, job in enumerate(applications, 2):
+    for row_num, job in enumerate(applications, 1):
         row_data = [
-            row_num - 1,
+            row_num,
             job.company,
             job.role,
             job.date_applied.strftime('%Y-%m-%d') if job.date_applied else '',
             job.status,
             job.notes or '',
         ]
-        fill_color = status_fill_map.get(job.status, 'FFFFFF')
-        row_fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type='solid')
+        ws.write_row(row_num, 0, row_data, status_formats.get(job.status, default_format))
 
-        for col_num, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col_num, value=value)
-            cell.fill = row_fill
-            cell.alignment = Alignment(vertical='center', wrap_text=True)
+    wb.close()
 
-    # Column widths
-    col_widths = [5, 25, 25, 15, 22, 40]
-    for i, width in enumerate(col_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
 
-    ws.row_dimensions[1].height = 20
+def _put_unless_cancelled(chunks, item, cancelled):
+    """Put ``item`` on the bounded queue; return False if the consumer went away."""
+    while True:
+        try:
+            chunks.put(item, timeout=1)
+            return True
+        except queue.Full:
+            if cancelled.is_set():
+                return False
+
+
+class _QueueWriter(io.RawIOBase):
+    """Write-only, unseekable file object that hands every write to a queue."""
+
+    def __init__(self, chunks, cancelled):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._aborted = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        chunk = bytes(data)
+        if self._aborted:
+            return len(chunk)  # let zipfile's cleanup finish quietly
+        if not _put_unless_cancelled(self._chunks, chunk, self._cancelled):
+            self._aborted = True
+            raise OSError('export stream cancelled by client')
+        return len(chunk)
+
+
+def _stream_xlsx():
+    """Yield .xlsx bytes while a producer thread is still writing the workbook.
+
+    The producer thread reads rows and feeds xlsxwriter. zipfile sees an
+    unseekable target and writes the archive sequentially, so each compressed
+    chunk goes to the client as soon as it is written, with no finished file
+    held in memory or on disk.
+    """
+    chunks = queue.Queue(maxsize=EXPORT_STREAM_QUEUE_SIZE)
+    cancelled = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            with app.app_context():
+                out = io.BufferedWriter(_QueueWriter(chunks, cancelled),
+                                        buffer_size=EXPORT_STREAM_CHUNK_SIZE)
+                _build_xlsx(out)
+                out.flush()
+            _put_unless_cancelled(chunks, done, cancelled)
+        except Exception as exc:
+            # Same bounded put: a client gone with the queue full must not
+            # leave this thread blocked forever.
+            _put_unless_cancelled(chunks, exc, cancelled)
+
+    threading.Thread(target=produce, name='export-stream', daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                app.logger.error('Streaming export failed', exc_info=chunk)
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+
+
+def _export_cache_path(epoch, version):
+    """Path of the pre-rendered export for a database epoch and data version."""
+    return os.path.join(app.instance_path, f'export-{epoch}-v{version}.xlsx')
+
+
+def _remove_stale_exports(epoch, version):
+    """Delete pre-rendered exports older than ``version`` or from another epoch.
+
+    Files for the same or a newer version are left alone: another request,
+    possibly in another process, may be about to send them.
+    """
+    for path in glob.glob(os.path.join(app.instance_path, 'export-*-v*.xlsx')):
+        match = _EXPORT_FILE_RE.fullmatch(os.path.basename(path))
+        if match is None:
+            continue
+        if match['epoch'] == epoch and int(match['version']) >= version:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _prerendered_export(epoch, version):
+    """Return the cached export for ``version`` opened for reading, building it if needed.
+
+    The file is opened before anything else looks at it, so a concurrent sweep
+    removing it can't turn into a FileNotFoundError inside send_file.
+    """
+    path = _export_cache_path(epoch, version)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    # Build under a temp name and rename, so concurrent requests never see
+    # (or serve) a half-written file. The temp file is opened first, so our
+    # handle stays valid even if the renamed file is swept right away.
+    fd, tmp_path = tempfile.mkstemp(dir=app.instance_path, prefix='.export-', suffix='.xlsx')
+    os.close(fd)
+    try:
+        _build_xlsx(tmp_path)
+        fileobj = open(tmp_path, 'rb')
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    _remove_stale_exports(epoch, version)
+    return fileobj
+
+
+def _send_export_file(fileobj, etag):
+    """send_file() for an open export, keeping Range and conditional support."""
+    stat = os.fstat(fileobj.fileno())
+    response = send_file(
+        fileobj,
+        as_attachment=True,
+        download_name=EXPORT_DOWNLOAD_NAME,
+        mimetype=XLSX_MIMETYPE,
+        etag=etag,
+        last_modified=stat.st_mtime,
+        conditional=False,
+    )
+    response.content_length = stat.st_size
+    try:
+        return response.make_conditional(request, accept_ranges=True,
+                                         complete_length=stat.st_size)
+    except RequestedRangeNotSatisfiable:
+        fileobj.close()
+        raise
+
+
+@app.route('/export')
+def export():
+    """Export all applications to an Excel (.xlsx) file."""
+    # The ETag is the database-wide data version, so a 304 from any worker
+    # means no process has committed a change since the client's copy.
+    epoch, version = get_data_version()
+    etag = f'{epoch}-{version}'
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+
+    if app.config['EXPORT_PRERENDER']:
+        # Served from the cached file; Range/conditional requests handled too
+        return _send_export_file(_prerendered_export(epoch, version), etag)
+
+    return Response(
+        stream_with_context(_stream_xlsx()),
+        mimetype=XLSX_MIMETYPE,
+        headers={'Content-Disposition': f'attachment; filename={EXPORT_DOWNLOAD_NAME}',
+                 'ETag': f'"{etag}"'},
+    )
+
+
+# ── Background Export ──────────────────────────────────────────────────────────
+# POST /export builds the workbook on a worker thread and returns a token right
+# away; the page polls /export/status/<token> and then fetches the file from
+# /export/download/<token>. GET /export remains the synchronous fallback. With
+# EXPORT_PRERENDER on, jobs reuse the pre-rendered file instead of rebuilding.
+#
+# Job state lives in marker files under instance/, not in this process, so the
+# status and download requests may land on any gunicorn worker:
+#   export-job-<token>.pending  queued or running
+#   export-job-<token>.xlsx     finished
+#   export-job-<token>.failed   the build raised (see the worker's log)
+# A job whose worker dies mid-build stops refreshing its .pending marker and
+# is pruned like any other expired job.
+_export_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='export')
+
 
-    # Save to buffer and send
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+def _export_job_path(token, suffix):
+    """Path of the ``suffix`` state file for a background export job."""
+    return os.path.join(app.instance_path, f'export-job-{token}{suffix}')
 
+
+def _link_prerendered_export(job_path):
+    """Point ``job_path`` at the pre-rendered export for the current data version.
+
+    A hard link shares the cached file instead of writing another copy; if
+    linking isn't possible the cached file is copied from its open handle.
+    """
+    epoch, version = get_data_version()
+    with _prerendered_export(epoch, version) as cached:
+        try:
+            os.link(_export_cache_path(epoch, version), job_path)
+        except OSError:
+            with open(job_path, 'wb') as out:
+                shutil.copyfileobj(cached, out)
+
+
+def _touch_while_running(path, stop):
+    """Refresh ``path``'s mtime until ``stop`` is set, so pruning skips live jobs."""
+    while not stop.wait(EXPORT_JOB_TTL / 4):
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+
+
+def _run_export_job(token):
+    """Worker-thread body: build the export for ``token`` and record the outcome."""
+    pending = _export_job_path(token, '.pending')
+    stop_touching = threading.Event()
+    threading.Thread(target=_touch_while_running, args=(pending, stop_touching),
+                     name=f'export-job-{token[:8]}', daemon=True).start()
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=app.instance_path, prefix='.export-job-',
+                                        suffix='.xlsx')
+        os.close(fd)
+        with app.app_context():
+            if app.config['EXPORT_PRERENDER']:
+                os.remove(tmp_path)  # os.link() needs a free name
+                _link_prerendered_export(tmp_path)
+            else:
+                _build_xlsx(tmp_path)
+        os.replace(tmp_path, _export_job_path(token, '.xlsx'))
+    except Exception:
+        app.logger.exception('Background export %s failed', token)
+        if tmp_path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+        open(_export_job_path(token, '.failed'), 'w').close()
+    finally:
+        stop_touching.set()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(pending)
+
+
+def _prune_export_jobs():
+    """Delete job files (any state) last touched more than EXPORT_JOB_TTL ago.
+
+    Running jobs keep touching their .pending marker, so only markers left by
+    a dead worker go stale.
+    """
+    cutoff = time.time() - EXPORT_JOB_TTL
+    leftovers = os.path.join(app.instance_path, '.export-job-*.xlsx')  # from crashed builds
+    for path in glob.glob(_export_job_path('*', '.*')) + glob.glob(leftovers):
+        with contextlib.suppress(FileNotFoundError):
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+
+def _export_job_state(token):
+    """Return 'ready', 'failed' or 'pending' for ``token``, or 404 if unknown."""
+    if not token.isalnum():
+        abort(404)
+    # Checked in this order because a finished job writes its result before
+    # removing the .pending marker.
+    for state, suffix in [('ready', '.xlsx'), ('failed', '.failed'), ('pending', '.pending')]:
+        if os.path.exists(_export_job_path(token, suffix)):
+            return state
+    abort(404)
+
+
+@app.route('/export', methods=['POST'])
+def export_start():
+    """Queue a background export and return a token to poll.
+
+    If the pre-rendered file for the current data version already exists,
+    nothing needs building: the page is sent straight to GET /export, which
+    serves that file (and 304s repeat downloads).
+    """
+    if (app.config['EXPORT_PRERENDER']
+            and os.path.exists(_export_cache_path(*get_data_version()))):
+        return jsonify(state='ready', download_url=url_for('export'))
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    _prune_export_jobs()
+    token = uuid.uuid4().hex
+    open(_export_job_path(token, '.pending'), 'w').close()
+    _export_executor.submit(_run_export_job, token)
+
+    status_url = url_for('export_status', token=token)
+    return jsonify(token=token, status_url=status_url), 202, {'Location': status_url}
+
+
+@app.route('/export/status/<token>')
+def export_status(token):
+    """Report whether a background export is still running, failed or ready."""
+    state = _export_job_state(token)
+    if state == 'pending':
+        return jsonify(state='pending'), 202
+    if state == 'failed':
+        return jsonify(state='failed'), 500
+    return jsonify(state='ready', download_url=url_for('export_download', token=token))
+
+
+@app.route('/export/download/<token>')
+def export_download(token):
+    """Send the file produced by a finished background export."""
+    if _export_job_state(token) != 'ready':
+        abort(409)
+    try:
+        fileobj = open(_export_job_path(token, '.xlsx'), 'rb')
+    except FileNotFoundError:  # pruned since the state check
+        abort(404)
     return send_file(
-        buffer,
+        fileobj,
         as_attachment=True,
-        download_name='job_applications.xlsx',
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        download_name=EXPORT_DOWNLOAD_NAME,
+        mimetype=XLSX_MIMETYPE,
     )
 
 
+# ── Template Warm-up ───────────────────────────────────────────────────────────
+def warm_template_cache():
+    """Compile every template once at startup so no request pays for it.
+
+    Outside debug mode Jinja also stops stat-checking template files on each
+    render. TEMPLATES_AUTO_RELOAD is left unset, so ``app.run(debug=True)``
+    still turns reloading back on for local development.
+    """
+    if not app.debug:
+        app.jinja_env.auto_reload = False
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+
+# ── Startup ────────────────────────────────────────────────────────────────────
+# Runs on import, so gunicorn workers (app:app) bring an existing jobs.db up to
+# date too, not just ``python app.py``.
+with app.app_context():
+    init_db()
+warm_template_cache()
+
+
 # ── Entry Point ────────────────────────────────────────────────────────────────
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()  # Create tables if they don't exist
     app.run(debug=True)
@@ -1,6 +1,6 @@
 /**
  * JobTracker – main.js
- * Handles: delete modal population
+ * Handles: delete modal population, background Excel export
  */
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -21,6 +21,45 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
 
+  // ── Background Excel export ───────────────────────────────────────────────
+  // POST /export queues the build (or reports a cached file as ready at once);
+  // poll until ready, then download the file.
+  // Any failure falls back to the link's own synchronous GET /export.
+  document.querySelectorAll('[data-async-export]').forEach(link => {
+    link.addEventListener('click', async (event) => {
+      event.preventDefault();
+      if (link.classList.contains('disabled')) return;
+      link.classList.add('disabled');
+
+      try {
+        const start = await fetch(link.href, { method: 'POST' });
+        if (!start.ok) throw new Error(`export start: ${start.status}`);
+        const { state, download_url, status_url } = await start.json();
+
+        // Already built for the current data: download it right away
+        if (state === 'ready') {
+          window.location = download_url;
+          return;
+        }
+
+        while (true) {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          const res  = await fetch(status_url);
+          const body = await res.json();
+          if (body.state === 'ready') {
+            window.location = body.download_url;
+            break;
+          }
+          if (body.state !== 'pending') throw new Error(`export ${body.state}`);
+        }
+      } catch (err) {
+        window.location = link.href;
+      } finally {
+        link.classList.remove('disabled');
+      }
+    });
+  });
+
   // ── Auto-dismiss alerts after 4 s ─────────────────────────────────────────
   document.querySelectorAll('.alert').forEach(alert => {
     setTimeout(() => {